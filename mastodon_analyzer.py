@@ -6,111 +6,521 @@ Analyzes posts for potential scams and phishing attempts using OpenRouter API.
 
 import re
 import sys
-import json
+import html
+import orjson
+import math
+import time
+import zlib
+import base64
+import hashlib
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, urljoin
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Callable, TYPE_CHECKING
 import click
-from bs4 import BeautifulSoup
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
 
+# openai and selectolax are imported where first needed: openai alone
+# accounts for most of the startup time of --help and text-only runs
+if TYPE_CHECKING:
+    from selectolax.lexbor import LexborHTMLParser
+
 # Load environment variables
 load_dotenv()
 
+# Post ID formats: /statuses/<id>, /posts/<id>, /status/<id> and /@user/<id>
+_POST_ID_RE = re.compile(r'/(?:statuses|posts|status)/(\d+)|/@[^/]+/(\d+)')
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Bare domains and hosts in links, e.g. masto-login.xyz
+_DOMAIN_RE = re.compile(r'\b(?:[\w-]+\.)+[a-z]{2,}\b', re.IGNORECASE)
+
+# Anything a short post could use to point somewhere or promise money
+_NON_TRIVIAL_RE = re.compile(r'http|www\.|/|@|%|[$¢£¥€₹₽₿]|\b[\w-]+\.[a-z]{2,}\b', re.IGNORECASE)
+
+# Phrases that rarely appear outside scams and phishing, found with a single
+# scan before any AI call and shown as red flags
+RED_FLAG_KEYWORDS = (
+    'act now', 'limited time', 'urgent', 'click here', 'suspended', 'seed phrase',
+    'airdrop', 'guaranteed', 'dm me', 'send money'
+)
+
+# Everyday words that scams use too; only handed to the model as context
+HINT_KEYWORDS = (
+    'immediately', 'verify', 'verification', 'password', 'login', 'wallet', 'bitcoin', 'btc',
+    'crypto', 'giveaway', 'free', 'winner', 'congratulations', 'claim', 'prize', 'investment'
+)
+
+_RED_FLAG_SET = frozenset(RED_FLAG_KEYWORDS)
+
+# Longest phrases first so overlapping keywords match the most specific one
+_KEYWORD_RE = re.compile(
+    r'\b(?:' + '|'.join(
+        re.escape(keyword) for keyword in sorted(RED_FLAG_KEYWORDS + HINT_KEYWORDS, key=len, reverse=True)
+    ) + r')\b',
+    re.IGNORECASE
+)
+
+# Selectors for different Mastodon/Fediverse interfaces
+_CONTENT_SELECTORS = (
+    '.status__content',
+    '.detailed-status__wrapper .status__content',
+    '[data-testid="status-content"]',
+    '.post-content',
+    '.toot-content',
+    'article .content',
+    '.status-content'
+)
+
+_AUTHOR_SELECTORS = (
+    '.status__display-name strong',
+    '.detailed-status__display-name strong',
+    '.display-name__account',
+    '.author-name',
+    '.username'
+)
+
+# Each union selector is matched in a single tree walk; the first hit in
+# document order wins
+_CONTENT_SELECTOR = ', '.join(_CONTENT_SELECTORS)
+_AUTHOR_SELECTOR = ', '.join(_AUTHOR_SELECTORS)
+
+# Applied once per session; requests merges them into every request itself.
+# Connection and Accept-Encoding keep requests' defaults: keep-alive is
+# already sent, and only encodings urllib3 can decode here are advertised.
+_DEFAULT_HEADERS = (
+    ('User-Agent', 'Mozilla/5.0 (compatible; MastodonAnalyzer/1.0)'),
+)
+
+
+# Dimensions of the hashed character-trigram vectors used to spot near-duplicate posts
+_EMBEDDING_DIM = 512
+
+
+def _default_cache_dir() -> str:
+    """Directory for persistent analysis caches."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.expanduser(os.environ.get('ANALYZER_CACHE_DIR') or os.path.join(cache_home, 'mastodon_analyzer'))
+
+
+def _embed_text(text: str) -> List[float]:
+    """Embed text as an L2-normalized vector of hashed character trigrams."""
+    normalized = ' '.join(text.lower().split())
+    vector = [0.0] * _EMBEDDING_DIM
+    
+    # crc32 rather than hash() so vectors stay comparable across processes
+    for i in range(len(normalized) - 2):
+        vector[zlib.crc32(normalized[i:i + 3].encode()) % _EMBEDDING_DIM] += 1.0
+    
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm:
+        vector = [value / norm for value in vector]
+    return vector
+
+
+def _load_json_file(path: str, default: Any) -> Any:
+    """Load a JSON cache file, falling back to default if it is missing or corrupt."""
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (OSError, ValueError):
+        return default
+
+
+def _save_json_file(path: str, data: Any):
+    """Atomically write a JSON cache file."""
+    # Caches are best-effort: a failed write only costs future hits
+    try:
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # A temp file per write, so concurrent runs sharing the cache
+        # directory never replace the cache with each other's partial writes
+        f = tempfile.NamedTemporaryFile(dir=directory, prefix=os.path.basename(path), suffix='.tmp', delete=False)
+        try:
+            with f:
+                f.write(orjson.dumps(data))
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+    except OSError:
+        pass
+
+
+class _JSONObjectScanner:
+    """Finds the first balanced {...} block in text that arrives in chunks."""
+    
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._offsets: List[int] = []
+        self._length = 0
+        self._next = 0
+        self._pos = 0
+        self._start = -1
+        self._start_chunk = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: Optional[str] = None
+    
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        return ''.join(self._chunks)
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add a chunk of text; returns the JSON block once it is complete."""
+        self._chunks.append(chunk)
+        self._offsets.append(self._length)
+        self._length += len(chunk)
+        
+        if self.result is not None:
+            return self.result
+        return self._scan()
+    
+    def skip(self) -> Optional[str]:
+        """Reject the block just found and look for the next one after it."""
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result = None
+        return self._scan()
+    
+    def _scan(self) -> Optional[str]:
+        """Continue scanning from where the last scan stopped."""
+        # Single linear pass counting brace depth outside of string literals,
+        # so braces inside values don't end the object early and malformed
+        # model output can't trigger regex backtracking. Rejected blocks are
+        # resumed after, never rescanned, which keeps the scan O(n)
+        while self._next < len(self._chunks):
+            chunk = self._chunks[self._next]
+            offset = self._offsets[self._next]
+            i = self._pos - offset
+            
+            while i < len(chunk):
+                if self._start == -1:
+                    i = chunk.find('{', i)
+                    if i == -1:
+                        break
+                    self._start = offset + i
+                    self._start_chunk = self._next
+                
+                char = chunk[i]
+                if self._in_string:
+                    if self._escaped:
+                        self._escaped = False
+                    elif char == '\\':
+                        self._escaped = True
+                    elif char == '"':
+                        self._in_string = False
+                elif char == '"':
+                    self._in_string = True
+                elif char == '{':
+                    self._depth += 1
+                elif char == '}':
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._pos = offset + i + 1
+                        start_offset = self._offsets[self._start_chunk]
+                        text = ''.join(self._chunks[self._start_chunk:self._next + 1])
+                        self.result = text[self._start - start_offset:self._pos - start_offset]
+                        return self.result
+                i += 1
+            
+            self._pos = offset + len(chunk)
+            self._next += 1
+        
+        return None
+
+
+def _is_json_object(text: str) -> bool:
+    """Whether text parses as a JSON object."""
+    try:
+        return isinstance(orjson.loads(text), dict)
+    except ValueError:
+        return False
+
+
+def _find_keywords(content: str) -> Tuple[List[str], List[str]]:
+    """Return the red flag and hint keywords found in the content, each in order of first appearance."""
+    found = dict.fromkeys(match.lower() for match in _KEYWORD_RE.findall(content))
+    red_flags = [keyword for keyword in found if keyword in _RED_FLAG_SET]
+    hints = [keyword for keyword in found if keyword not in _RED_FLAG_SET]
+    return red_flags, hints
+
+
+def _is_trivial_content(content: str, keywords: List[str]) -> bool:
+    """Whether a post is too short and plain to carry any scam indicators."""
+    # Both caps, since scripts without spaces between words read as one word
+    if keywords or len(content) >= 20 or len(content.split()) >= 4:
+        return False
+    
+    # Links, bare domains, handles, percentages and prices are what short
+    # scams are made of
+    if _NON_TRIVIAL_RE.search(content):
+        return False
+    
+    # Shouting is a pressure tactic even in a few words
+    letters = [char for char in content if char.isalpha()]
+    upper_ratio = sum(char.isupper() for char in letters) / max(1, len(letters))
+    return upper_ratio < 0.5
+
+
+def _load_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the JSON object in a model response.
+    
+    Returns None if the response contains no JSON object; raises
+    orjson.JSONDecodeError if the object found is not valid JSON or was
+    cut off before it closed.
+    """
+    # Responses in JSON mode are just the object, so try that first
+    try:
+        parsed = orjson.loads(text)
+        if isinstance(parsed, dict):
+            return parsed
+    except ValueError:
+        pass
+    
+    # Models ignoring JSON mode may wrap the object in prose
+    json_text = _find_json_object(text)
+    if json_text is None:
+        # A '{' that never closes is a reply truncated at max_tokens, not
+        # prose to guess a verdict from
+        start = text.find('{')
+        if start != -1:
+            raise orjson.JSONDecodeError('Unterminated JSON object', text, start)
+        return None
+    return orjson.loads(json_text)
+
+
+def _quantize_vector(vector: List[float]) -> bytes:
+    """Quantize a normalized embedding to one byte per component."""
+    # Trigram counts are never negative, so the full unsigned range is usable
+    return bytes(round(value * 255) for value in vector)
+
+
+def _vector_norm(vector: bytes) -> float:
+    """Euclidean norm of a quantized embedding."""
+    return math.sqrt(sum(value * value for value in vector))
+
+
+def _find_json_object(text: str) -> Optional[str]:
+    """
+    Return the first {...} block in text that is a valid JSON object.
+    
+    Closed blocks that aren't valid JSON, such as stray braces in prose, are
+    skipped. If no block parses, the first closed block is returned so the
+    caller sees why it is invalid; None means no block was closed at all.
+    """
+    scanner = _JSONObjectScanner()
+    json_text = scanner.feed(text)
+    first = json_text
+    
+    # A block still open at the end is a truncated object, so the objects
+    # nested in it are never candidates
+    while json_text is not None:
+        if _is_json_object(json_text):
+            return json_text
+        json_text = scanner.skip()
+    
+    return first
+
+
+def _parse_post_html(url: str, page: str) -> Dict[str, Any]:
+    """Parse a fetched post page and extract its post data."""
+    from selectolax.lexbor import LexborHTMLParser
+    return _extract_from_html(LexborHTMLParser(page), url)
+
+
+def _extract_from_html(tree: 'LexborHTMLParser', url: str) -> Dict[str, Any]:
+    """Extract post data from HTML content."""
+    post_data = {
+        'url': url,
+        'content': '',
+        'author': '',
+        'timestamp': '',
+        'instance': urlparse(url).netloc
+    }
+
+    content_elem = tree.css_first(_CONTENT_SELECTOR)
+    if content_elem:
+        post_data['content'] = content_elem.text(strip=True)
+
+    # Extract author information
+    author_elem = tree.css_first(_AUTHOR_SELECTOR)
+    if author_elem:
+        post_data['author'] = author_elem.text(strip=True)
+
+    # Try to extract from meta tags as fallback
+    if not post_data['content']:
+        og_description = tree.css_first('meta[property="og:description"]')
+        if og_description:
+            post_data['content'] = og_description.attributes.get('content') or ''
+
+    return post_data
+
+
+class _RateLimiter:
+    """Paces requests to one host using the X-RateLimit headers it returns."""
+    
+    def __init__(self, max_wait: float = 300):
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
+    
+    def wait(self):
+        """Block until the host's rate limit allows another request."""
+        with self._lock:
+            if self._remaining is None:
+                return
+            
+            if self._remaining > 0:
+                # Reserve a slot for this request until its headers arrive
+                self._remaining -= 1
+                return
+            
+            # Holding the lock while sleeping queues up other requests to
+            # this host behind the reset as well
+            delay = min(self._reset_at - time.time(), self.max_wait)
+            if delay > 0:
+                time.sleep(delay)
+            self._remaining = None
+    
+    def update(self, headers):
+        """Refresh the limit from a response's headers."""
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        
+        try:
+            remaining = int(remaining)
+        except ValueError:
+            return
+        
+        # Mastodon sends an ISO 8601 timestamp; other servers use epoch
+        # seconds or seconds until the reset
+        try:
+            reset_at = float(reset)
+            if reset_at < 1e9:
+                reset_at += time.time()
+        except ValueError:
+            try:
+                reset_at = datetime.fromisoformat(reset.replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                return
+        
+        with self._lock:
+            self._remaining = remaining
+            self._reset_at = reset_at
+
 
 class MastodonPostExtractor:
     """Extracts post content from Mastodon/Fediverse URLs."""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 32):
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; MastodonAnalyzer/1.0)'
-        })
+        self.session.headers.update(_DEFAULT_HEADERS)
+        
+        # Keep plenty of persistent connections per instance so batch runs
+        # reuse TLS sessions, and retry transient failures with backoff
+        adapter = HTTPAdapter(
+            pool_connections=100,
+            pool_maxsize=100,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 502, 503, 504],
+                raise_on_status=False
+            )
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Keep the number of concurrent extractions within the session's
+        # connection pool
+        self.max_workers = max_workers
+        
+        self.rate_limiters: Dict[str, _RateLimiter] = {}
     
     def extract_post_data(self, url: str) -> Optional[Dict[str, Any]]:
         """
         Extract post data from a Mastodon/Fediverse URL.
         
+        The Mastodon API is asked first and the web page is only fetched if
+        the API yields no content, so a URL always gives the same text and
+        usually costs a single request.
+        
         Args:
             url: The URL to the post
             
         Returns:
             Dictionary containing post data or None if extraction fails
         """
-        try:
-            # Parse the URL to understand the structure
-            parsed_url = urlparse(url)
-            
-            # Try to get the post via web interface first
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract post content using various selectors
-            post_data = self._extract_from_html(soup, url)
-            
-            # If HTML extraction fails, try API approach
-            if not post_data.get('content'):
-                post_data = self._try_api_extraction(url, parsed_url)
-            
+        # Parse the URL to understand the structure
+        parsed_url = urlparse(url)
+        
+        post_data = self._try_api_extraction(url, parsed_url)
+        if post_data.get('content'):
             return post_data
-            
+        
+        try:
+            html_data = self._try_html_extraction(url)
         except Exception as e:
             click.echo(f"Error extracting post: {e}", err=True)
             return None
-    
-    def _extract_from_html(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Extract post data from HTML content."""
-        post_data = {
-            'url': url,
-            'content': '',
-            'author': '',
-            'timestamp': '',
-            'instance': urlparse(url).netloc
-        }
-        
-        # Try different selectors for different Mastodon interfaces
-        content_selectors = [
-            '.status__content',
-            '.detailed-status__wrapper .status__content',
-            '[data-testid="status-content"]',
-            '.post-content',
-            '.toot-content',
-            'article .content',
-            '.status-content'
-        ]
         
-        for selector in content_selectors:
-            content_elem = soup.select_one(selector)
-            if content_elem:
-                post_data['content'] = content_elem.get_text(strip=True)
-                break
-        
-        # Extract author information
-        author_selectors = [
-            '.status__display-name strong',
-            '.detailed-status__display-name strong',
-            '.display-name__account',
-            '.author-name',
-            '.username'
-        ]
+        return html_data if html_data.get('content') else post_data
+    
+    def extract_many(self, urls: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Extract post data from several URLs concurrently.
         
-        for selector in author_selectors:
-            author_elem = soup.select_one(selector)
-            if author_elem:
-                post_data['author'] = author_elem.get_text(strip=True)
-                break
+        Args:
+            urls: The URLs to the posts
+            
+        Returns:
+            List of post data dictionaries (None where extraction failed),
+            in the same order as the input URLs
+        """
+        if not urls:
+            return []
         
-        # Try to extract from meta tags as fallback
-        if not post_data['content']:
-            og_description = soup.find('meta', property='og:description')
-            if og_description:
-                post_data['content'] = og_description.get('content', '')
+        # Pages parse in a couple of milliseconds, so parsing stays on the
+        # fetch threads; a process pool measured slower than the hand-off costs
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            return list(executor.map(self.extract_post_data, urls))
+    
+    def _get(self, url: str) -> requests.Response:
+        """GET a URL, staying within the rate limit of the instance serving it."""
+        netloc = urlparse(url).netloc
+        limiter = self.rate_limiters.get(netloc) or self.rate_limiters.setdefault(netloc, _RateLimiter())
         
-        return post_data
+        limiter.wait()
+        response = self.session.get(url, timeout=10)
+        limiter.update(response.headers)
+        return response
+    
+    def _try_html_extraction(self, url: str) -> Dict[str, Any]:
+        """Fetch the post's web page and extract post data from it."""
+        return _parse_post_html(url, self._fetch_page(url))
+    
+    def _fetch_page(self, url: str) -> str:
+        """Fetch the post's web page."""
+        response = self._get(url)
+        response.raise_for_status()
+        return response.text
     
     def _try_api_extraction(self, url: str, parsed_url) -> Dict[str, Any]:
         """Try to extract post data using Mastodon API."""
@@ -130,11 +540,13 @@ class MastodonPostExtractor:
             
             # Try Mastodon API endpoint
             api_url = f"https://{parsed_url.netloc}/api/v1/statuses/{post_id}"
-            response = self.session.get(api_url, timeout=10)
+            response = self._get(api_url)
             
             if response.status_code == 200:
                 data = response.json()
-                post_data['content'] = BeautifulSoup(data.get('content', ''), 'html.parser').get_text(strip=True)
+                # The API returns a small, well-formed HTML fragment, so
+                # stripping tags is enough and needs no parser
+                post_data['content'] = html.unescape(_TAG_RE.sub('', data.get('content') or '')).strip()
                 post_data['author'] = data.get('account', {}).get('display_name', '')
                 post_data['timestamp'] = data.get('created_at', '')
         
@@ -145,37 +557,346 @@ class MastodonPostExtractor:
     
     def _extract_post_id(self, url: str) -> Optional[str]:
         """Extract post ID from various Mastodon URL formats."""
-        patterns = [
-            r'/statuses/(\d+)',
-            r'/@[^/]+/(\d+)',
-            r'/posts/(\d+)',
-            r'/status/(\d+)'
-        ]
+        match = _POST_ID_RE.search(url)
+        if not match:
+            return None
         
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
+        return next((group for group in match.groups() if group), None)
+
+
+class SemanticCache:
+    """Reuses analyses of near-duplicate posts, persisted as JSON on disk."""
+    
+    def __init__(self, path: str, threshold: float = 0.92, ttl: int = 7 * 24 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = self._load()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def for_model(cls, model: str, cache_dir: Optional[str] = None, **kwargs) -> 'SemanticCache':
+        """Open the cache file belonging to a model."""
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model)
+        return cls(os.path.join(cache_dir or _default_cache_dir(), f'semantic-{name}.json'), **kwargs)
+    
+    def lookup(self, content: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a stored analysis for content similar to the given content.
         
-        return None
+        Args:
+            content: The post content
+            
+        Returns:
+            The stored analysis of the most similar fresh entry whose cosine
+            similarity reaches the threshold, or None
+        """
+        vector = _quantize_vector(_embed_text(content))
+        norm = _vector_norm(vector)
+        if not norm:
+            return None
+        
+        oldest = time.time() - self.ttl
+        best_entry = None
+        best_score = self.threshold
+        
+        for entry in self.entries:
+            if entry['created_at'] < oldest:
+                continue
+            # Divide by the norms of the quantized vectors, which drift
+            # slightly from 1 through rounding
+            score = sum(a * b for a, b in zip(vector, entry['vector'])) / (norm * entry['norm'])
+            if score >= best_score:
+                best_entry = entry
+                best_score = score
+        
+        return dict(best_entry['analysis']) if best_entry else None
+    
+    def add(self, content: str, analysis: Dict[str, Any]):
+        """Store an analysis and persist the cache."""
+        content_hash = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+        vector = _quantize_vector(_embed_text(content))
+        norm = _vector_norm(vector)
+        if not norm:
+            return
+        
+        with self._lock:
+            oldest = time.time() - self.ttl
+            
+            # Drop stale entries and any previous analysis of the same content
+            entries = [
+                entry for entry in self.entries
+                if entry['created_at'] >= oldest and entry['content_hash'] != content_hash
+            ]
+            entries.append({
+                'content_hash': content_hash,
+                'vector': vector,
+                'norm': norm,
+                'analysis': analysis,
+                'created_at': time.time()
+            })
+            self.entries = entries[-self.max_entries:]
+            self._save()
+    
+    def _load(self) -> List[Dict[str, Any]]:
+        entries = []
+        for entry in _load_json_file(self.path, []):
+            # Skip entries written before vectors were quantized
+            if not isinstance(entry.get('vector'), str) or not entry.get('norm'):
+                continue
+            entries.append(dict(entry, vector=base64.b64decode(entry['vector'])))
+        return entries
+    
+    def _save(self):
+        _save_json_file(self.path, [
+            dict(entry, vector=base64.b64encode(entry['vector']).decode('ascii'))
+            for entry in self.entries
+        ])
+
+
+class PromptCache:
+    """Exact-match cache of analyses keyed by a hash of the full model request."""
+    
+    def __init__(self, path: str, ttl: int = 7 * 24 * 3600, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = _load_json_file(path, {})
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def open(cls, cache_dir: Optional[str] = None, **kwargs) -> 'PromptCache':
+        """Open the shared prompt cache file."""
+        return cls(os.path.join(cache_dir or _default_cache_dir(), 'prompts.json'), **kwargs)
+    
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Hash everything that determines the model's answer into a cache key."""
+        return hashlib.blake2b('\x1f'.join(str(part) for part in parts).encode(), digest_size=16).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the fresh analysis stored under key, or None."""
+        entry = self.entries.get(key)
+        if entry is None or entry['created_at'] < time.time() - self.ttl:
+            return None
+        return dict(entry['analysis'])
+    
+    def set(self, key: str, analysis: Dict[str, Any]):
+        """Store an analysis and persist the cache."""
+        with self._lock:
+            # Re-insert so the dict stays ordered from oldest to newest
+            self.entries.pop(key, None)
+            self.entries[key] = {'analysis': analysis, 'created_at': time.time()}
+            
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            _save_json_file(self.path, self.entries)
+
+
+class ExemplarIndex:
+    """Classifies posts that closely match labeled scam/legitimate exemplars without an AI call."""
+    
+    RECOMMENDATIONS = {
+        'scam': 'Do not send money or engage with this offer. Report this post to instance moderators.',
+        'phishing': 'Do not click any links or provide personal information. Report this post to instance moderators.',
+        'legitimate': 'No action needed.'
+    }
+    
+    def __init__(self, exemplars: List[Dict[str, Any]], threshold: float = 0.88):
+        self.exemplars = exemplars
+        self.threshold = threshold
+        self.vectors = [_embed_text(exemplar['text']) for exemplar in exemplars]
+    
+    @classmethod
+    def load(cls, path: Optional[str] = None, **kwargs) -> 'ExemplarIndex':
+        """Load exemplars from a JSON file, by default the one shipped with the analyzer."""
+        path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scam_exemplars.json')
+        return cls(_load_json_file(path, []), **kwargs)
+    
+    def match(self, content: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the exemplar that unambiguously matches the content.
+        
+        Args:
+            content: The post content
+            
+        Returns:
+            Dictionary with the matched exemplar and its similarity, or None
+            if the best match is too weak, its neighbours disagree on the label,
+            or a legitimate match carries red flags or links the exemplar lacks
+        """
+        if len(self.exemplars) < 3:
+            return None
+        
+        vector = _embed_text(content)
+        scores = [sum(a * b for a, b in zip(vector, other)) for other in self.vectors]
+        top = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:3]
+        
+        best = self.exemplars[top[0]]
+        if scores[top[0]] < self.threshold:
+            return None
+        
+        # The closest exemplars must agree, so a post near the boundary
+        # between clusters still goes to the AI model
+        label, votes = Counter(self.exemplars[i]['label'] for i in top).most_common(1)[0]
+        if votes < 2 or label != best['label']:
+            return None
+        
+        # Scams copy legitimate notices and add a payload, so only vouch for
+        # a post that adds no red flags and no links of its own
+        if label == 'legitimate':
+            domains = {domain.lower() for domain in _DOMAIN_RE.findall(best['text'])}
+            if _find_keywords(content)[0] or any(domain.lower() not in domains for domain in _DOMAIN_RE.findall(content)):
+                return None
+        
+        return {'exemplar': best, 'similarity': scores[top[0]]}
+    
+    def analyze(self, content: str) -> Optional[Dict[str, Any]]:
+        """Return an analysis of the content derived from a matching exemplar, or None."""
+        match = self.match(content)
+        if not match:
+            return None
+        
+        exemplar = match['exemplar']
+        return {
+            'is_suspicious': exemplar['label'] != 'legitimate',
+            'confidence': round(match['similarity'] * 100),
+            'category': exemplar['label'],
+            'explanation': f"Matched known pattern: {exemplar['text']}",
+            'red_flags': list(exemplar.get('red_flags', [])),
+            'recommendations': self.RECOMMENDATIONS.get(exemplar['label'], 'Manual review recommended')
+        }
 
 
 class ScamAnalyzer:
     """Analyzes posts for scam/phishing content using OpenRouter API."""
     
-    def __init__(self, api_key: str, model: str = "openai/gpt-oss-20b:free"):
+    _TEMPERATURE = 0.1
+    
+    # Result for posts too short and plain to be worth an AI call
+    _TRIVIAL_ANALYSIS = {
+        'is_suspicious': False,
+        'confidence': 95,
+        'category': 'legitimate',
+        'explanation': 'Trivial content, no risk indicators',
+        'red_flags': [],
+        'recommendations': 'No action needed.'
+    }
+    
+    _ANALYSIS_SYSTEM_PROMPT = "You are a cybersecurity expert specializing in identifying scams, phishing attempts, and fraudulent content on social media platforms."
+    
+    _JSON_ONLY_SYSTEM_PROMPT = "You are a cybersecurity expert. Respond only with valid JSON containing verdict, percentage, and reason fields."
+    
+    _ANALYSIS_FACTORS = """
+Consider these factors:
+- Urgency tactics ("act now", "limited time")
+- Requests for personal information
+- Suspicious links or promises
+- Too-good-to-be-true offers
+- Impersonation attempts
+- Grammar and spelling issues
+- Cryptocurrency or investment schemes
+- Fake giveaways or contests
+"""
+    
+    # Prompts start with the static instructions and end with the post, so
+    # providers can reuse their cached processing of the shared prefix
+    _STATIC_PROMPT_PREFIX = """
+Analyze the social media post given at the end of this message for potential scam, phishing, or fraudulent content.
+
+Please analyze this post and determine if it appears to be:
+1. A scam or fraudulent scheme
+2. A phishing attempt
+3. Legitimate content
+""" + _ANALYSIS_FACTORS + """
+Respond in JSON format with:
+{
+    "is_suspicious": boolean,
+    "confidence": number (0-100),
+    "category": "scam|phishing|legitimate|unclear",
+    "explanation": "detailed explanation of your analysis",
+    "red_flags": ["list", "of", "specific", "concerns"],
+    "recommendations": "what users should do"
+}
+"""
+    
+    _BATCH_PROMPT_PREFIX = """
+Analyze each of the social media posts given as JSON at the end of this message for potential scam, phishing, or fraudulent content.
+
+Please analyze each post separately and determine if it appears to be:
+1. A scam or fraudulent scheme
+2. A phishing attempt
+3. Legitimate content
+""" + _ANALYSIS_FACTORS + """
+Respond in JSON format with one analysis per post, identified by the post's id:
+{
+    "analyses": [
+        {
+            "id": "id of the post",
+            "is_suspicious": boolean,
+            "confidence": number (0-100),
+            "category": "scam|phishing|legitimate|unclear",
+            "explanation": "detailed explanation of your analysis",
+            "red_flags": ["list", "of", "specific", "concerns"],
+            "recommendations": "what users should do"
+        }
+    ]
+}
+"""
+    
+    _JSON_ONLY_PROMPT_PREFIX = """
+Analyze the social media post given at the end of this message for scam/phishing content.
+
+Respond with ONLY valid JSON in this exact format:
+{
+    "verdict": "legitimate|suspicious|scam|phishing",
+    "percentage": number_0_to_100,
+    "reason": "brief explanation"
+}
+
+Consider: urgency tactics, personal info requests, suspicious links, too-good-to-be-true offers, impersonation, poor grammar, crypto schemes, fake giveaways.
+"""
+    
+    _ANALYSIS_POST_TEMPLATE = """
+POST CONTENT:
+{content}
+
+AUTHOR: {author}
+INSTANCE: {instance}
+PHRASES COMMON IN SCAMS: {red_flags}
+KEYWORDS MATCHED (may be benign): {hints}
+"""
+    
+    _JSON_ONLY_POST_TEMPLATE = """
+POST: {content}
+AUTHOR: {author}
+INSTANCE: {instance}
+PHRASES COMMON IN SCAMS: {red_flags}
+KEYWORDS MATCHED (may be benign): {hints}
+"""
+    
+    def __init__(self, api_key: str, model: str = "openai/gpt-oss-20b:free",
+                 semantic_cache: Optional[SemanticCache] = None, prompt_cache: Optional[PromptCache] = None,
+                 exemplars: Optional[ExemplarIndex] = None):
+        from openai import OpenAI
         self.client = OpenAI(
             base_url="https://openrouter.ai/api/v1",
             api_key=api_key
         )
         self.model = model
+        self.semantic_cache = semantic_cache
+        self.prompt_cache = prompt_cache
+        self.exemplars = exemplars
     
-    def analyze_post(self, post_data: Dict[str, Any], max_tokens: int = 1000) -> Dict[str, Any]:
+    def analyze_post(self, post_data: Dict[str, Any], max_tokens: int = 400,
+                     on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Analyze a post for scam/phishing indicators.
         
         Args:
             post_data: Dictionary containing post information
+            on_delta: Called with each piece of the model's response as it streams in
             
         Returns:
             Analysis results
@@ -192,37 +913,217 @@ class ScamAnalyzer:
                 'explanation': 'No content found in the post'
             }
         
-        prompt = self._create_analysis_prompt(content, author, instance)
+        red_flags, hints = _find_keywords(content)
+        if _is_trivial_content(content, red_flags + hints):
+            return dict(self._TRIVIAL_ANALYSIS)
+        
+        prompt = self._create_analysis_prompt(content, author, instance, red_flags, hints)
+        
+        cache_key = PromptCache.make_key(self.model, self._TEMPERATURE, max_tokens, self._ANALYSIS_SYSTEM_PROMPT, prompt)
+        cached = self._lookup_cached_analysis(content, cache_key)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a cybersecurity expert specializing in identifying scams, phishing attempts, and fraudulent content on social media platforms."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=max_tokens
-            )
-            
-            result = response.choices[0].message.content
-            return self._parse_analysis_result(result)
+            result = self._complete(self._ANALYSIS_SYSTEM_PROMPT, prompt, self._STATIC_PROMPT_PREFIX, max_tokens, on_delta)
+            analysis = self._parse_analysis_result(result, red_flags)
+            self._store_analysis(content, cache_key, analysis)
+            return analysis
             
         except Exception as e:
             return {
                 'error': f'Analysis failed: {str(e)}',
                 'is_suspicious': False,
                 'confidence': 0,
-                'explanation': 'Could not complete analysis due to API error'
+                'explanation': 'Could not complete analysis due to API error',
+                'red_flags': red_flags
+            }
+    
+    def analyze_posts(self, posts: List[Dict[str, Any]], max_tokens: int = 400,
+                      batch_size: int = 8, max_workers: int = 4) -> List[Dict[str, Any]]:
+        """
+        Analyze several posts, sending up to batch_size posts per API request.
+        
+        Args:
+            posts: List of dictionaries containing post information
+            max_tokens: Maximum response tokens per post
+            batch_size: Number of posts analyzed in a single request
+            max_workers: Number of requests in flight at once
+            
+        Returns:
+            Analysis results in the same order as the posts
+        """
+        analyses: List[Optional[Dict[str, Any]]] = [None] * len(posts)
+        pending = []
+        
+        for index, post_data in enumerate(posts):
+            content = post_data.get('content', '')
+            red_flags, hints = _find_keywords(content)
+            if not content or _is_trivial_content(content, red_flags + hints):
+                analyses[index] = self.analyze_post(post_data, max_tokens)
+                continue
+            
+            # Cache keys match those of analyze_post, so single and batch
+            # runs share cached analyses
+            prompt = self._create_analysis_prompt(
+                content, post_data.get('author', ''), post_data.get('instance', ''), red_flags, hints
+            )
+            cache_key = PromptCache.make_key(self.model, self._TEMPERATURE, max_tokens, self._ANALYSIS_SYSTEM_PROMPT, prompt)
+            cached = self._lookup_cached_analysis(content, cache_key)
+            if cached is not None:
+                analyses[index] = cached
+            else:
+                pending.append((index, post_data, cache_key))
+        
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+                for batch_results in executor.map(lambda batch: self._analyze_post_batch(batch, max_tokens), batches):
+                    for index, analysis in batch_results:
+                        analyses[index] = analysis
+        
+        return analyses
+    
+    def _analyze_post_batch(self, batch: List[tuple], max_tokens: int) -> List[tuple]:
+        """Analyze one batch of (index, post_data, cache_key) in a single request."""
+        keywords = {index: _find_keywords(post_data.get('content', '')) for index, post_data, _ in batch}
+        posts = [
+            {
+                'id': str(index),
+                'content': post_data.get('content', ''),
+                'author': post_data.get('author', ''),
+                'instance': post_data.get('instance', ''),
+                'phrases_common_in_scams': keywords[index][0],
+                'keywords_matched_may_be_benign': keywords[index][1]
             }
+            for index, post_data, _ in batch
+        ]
+        prompt = self._BATCH_PROMPT_PREFIX + "\nPOSTS:\n" + orjson.dumps({'posts': posts}).decode() + "\n"
+        
+        try:
+            result = self._complete(self._ANALYSIS_SYSTEM_PROMPT, prompt, self._BATCH_PROMPT_PREFIX, max_tokens * len(batch))
+        except Exception as e:
+            return [
+                (index, {
+                    'error': f'Analysis failed: {str(e)}',
+                    'is_suspicious': False,
+                    'confidence': 0,
+                    'explanation': 'Could not complete analysis due to API error',
+                    'red_flags': keywords[index][0]
+                })
+                for index, _, _ in batch
+            ]
+        
+        by_id = self._parse_batch_result(result)
+        results = []
+        
+        for index, post_data, cache_key in batch:
+            analysis = by_id.get(str(index))
+            if analysis is None:
+                # The model skipped or mangled this post, so ask about it alone
+                analysis = self.analyze_post(post_data, max_tokens)
+            else:
+                self._store_analysis(post_data['content'], cache_key, analysis)
+            results.append((index, analysis))
+        
+        return results
+    
+    def _parse_batch_result(self, result: str) -> Dict[str, Dict[str, Any]]:
+        """Parse a batch analysis result into analyses keyed by post id."""
+        try:
+            parsed = _load_json_object(result or '')
+            analyses = parsed.get('analyses', []) if parsed else []
+        except (orjson.JSONDecodeError, AttributeError):
+            return {}
+        
+        if not isinstance(analyses, list):
+            return {}
+        
+        by_id = {}
+        for analysis in analyses:
+            if isinstance(analysis, dict) and 'id' in analysis:
+                by_id[str(analysis.pop('id'))] = analysis
+        return by_id
+    
+    def _complete(self, system_prompt: str, prompt: str, prefix: str, max_tokens: int,
+                  on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """Stream a chat completion and return the generated text."""
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": self._user_message_content(prompt, prefix)
+                }
+            ],
+            temperature=self._TEMPERATURE,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            stream=True
+        )
+        
+        scanner = _JSONObjectScanner()
+        try:
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                
+                if on_delta:
+                    on_delta(delta)
+                
+                # Everything we need has arrived once a valid JSON object
+                # closes; braces in a preamble mustn't end the stream early
+                json_text = scanner.feed(delta)
+                while json_text is not None and not _is_json_object(json_text):
+                    json_text = scanner.skip()
+                if json_text is not None:
+                    break
+        finally:
+            response.close()
+        
+        return scanner.text
+    
+    def _lookup_cached_analysis(self, content: str, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached analysis for the request or a near-duplicate post."""
+        # Repeated requests are answered from the exact-match cache before
+        # spending any time on similarity search
+        if self.prompt_cache:
+            cached = self.prompt_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Near-duplicates of already analyzed posts don't need another API call
+        if self.semantic_cache:
+            cached = self.semantic_cache.lookup(content)
+            if cached is not None:
+                return cached
+        
+        # Neither do close matches of known scam and legitimate posts
+        if self.exemplars:
+            return self.exemplars.analyze(content)
+        
+        return None
+    
+    def _store_analysis(self, content: str, cache_key: str, analysis: Dict[str, Any]):
+        """Remember a successful analysis in the caches."""
+        # Unclear results include the free-text fallback for replies that
+        # weren't JSON, which must not be reused for a week
+        if 'error' in analysis or analysis.get('category') == 'unclear':
+            return
+        
+        if self.prompt_cache:
+            self.prompt_cache.set(cache_key, analysis)
+        if self.semantic_cache:
+            self.semantic_cache.add(content, analysis)
     
-    def analyze_post_json_only(self, post_data: Dict[str, Any], max_tokens: int = 500) -> Dict[str, Any]:
+    def analyze_post_json_only(self, post_data: Dict[str, Any], max_tokens: int = 400) -> Dict[str, Any]:
         """
         Analyze a post for scam/phishing indicators with JSON-only output.
         
@@ -243,27 +1144,39 @@ class ScamAnalyzer:
                 'reason': 'No content to analyze'
             }
         
-        prompt = self._create_json_only_prompt(content, author, instance)
+        red_flags, hints = _find_keywords(content)
+        if _is_trivial_content(content, red_flags + hints):
+            return {
+                'verdict': 'legitimate',
+                'percentage': self._TRIVIAL_ANALYSIS['confidence'],
+                'reason': self._TRIVIAL_ANALYSIS['explanation']
+            }
+        
+        prompt = self._create_json_only_prompt(content, author, instance, red_flags, hints)
+        
+        cache_key = PromptCache.make_key(self.model, self._TEMPERATURE, max_tokens, self._JSON_ONLY_SYSTEM_PROMPT, prompt)
+        if self.prompt_cache:
+            cached = self.prompt_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        if self.exemplars:
+            match = self.exemplars.match(content)
+            if match:
+                return {
+                    'verdict': match['exemplar']['label'],
+                    'percentage': round(match['similarity'] * 100),
+                    'reason': f"Matched known pattern: {match['exemplar']['text']}"
+                }
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a cybersecurity expert. Respond only with valid JSON containing verdict, percentage, and reason fields."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=max_tokens
-            )
+            result = self._complete(self._JSON_ONLY_SYSTEM_PROMPT, prompt, self._JSON_ONLY_PROMPT_PREFIX, max_tokens)
+            analysis = self._parse_json_only_result(result)
+            
+            if self.prompt_cache and analysis['verdict'] != 'error':
+                self.prompt_cache.set(cache_key, analysis)
             
-            result = response.choices[0].message.content
-            return self._parse_json_only_result(result)
+            return analysis
             
         except Exception as e:
             return {
@@ -272,32 +1185,19 @@ class ScamAnalyzer:
                 'reason': f'Analysis failed: {str(e)}'
             }
     
-    def _create_json_only_prompt(self, content: str, author: str, instance: str) -> str:
+    def _create_json_only_prompt(self, content: str, author: str, instance: str,
+                                 red_flags: List[str], hints: List[str]) -> str:
         """Create a simplified analysis prompt for JSON-only output."""
-        return f"""
-Analyze this social media post for scam/phishing content:
-
-POST: {content}
-AUTHOR: {author}
-INSTANCE: {instance}
-
-Respond with ONLY valid JSON in this exact format:
-{{
-    "verdict": "legitimate|suspicious|scam|phishing",
-    "percentage": number_0_to_100,
-    "reason": "brief explanation"
-}}
-
-Consider: urgency tactics, personal info requests, suspicious links, too-good-to-be-true offers, impersonation, poor grammar, crypto schemes, fake giveaways.
-"""
+        return self._JSON_ONLY_PROMPT_PREFIX + self._JSON_ONLY_POST_TEMPLATE.format(
+            content=content, author=author, instance=instance,
+            red_flags=', '.join(red_flags) or 'none', hints=', '.join(hints) or 'none'
+        )
     
     def _parse_json_only_result(self, result: str) -> Dict[str, Any]:
         """Parse the JSON-only analysis result."""
         try:
-            # Try to extract JSON from the response
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-            if json_match:
-                parsed = json.loads(json_match.group())
+            parsed = _load_json_object(result)
+            if parsed is not None:
                 # Ensure required fields exist
                 return {
                     'verdict': parsed.get('verdict', 'error'),
@@ -310,57 +1210,37 @@ Consider: urgency tactics, personal info requests, suspicious links, too-good-to
                     'percentage': 0,
                     'reason': 'Could not parse response'
                 }
-        except (json.JSONDecodeError, ValueError):
+        except ValueError:
             return {
                 'verdict': 'error',
                 'percentage': 0,
                 'reason': 'Invalid JSON response from AI'
             }
     
-    def _create_analysis_prompt(self, content: str, author: str, instance: str) -> str:
+    def _create_analysis_prompt(self, content: str, author: str, instance: str,
+                                red_flags: List[str], hints: List[str]) -> str:
         """Create the analysis prompt for the AI model."""
-        return f"""
-Analyze the following social media post for potential scam, phishing, or fraudulent content:
-
-POST CONTENT:
-{content}
-
-AUTHOR: {author}
-INSTANCE: {instance}
-
-Please analyze this post and determine if it appears to be:
-1. A scam or fraudulent scheme
-2. A phishing attempt
-3. Legitimate content
-
-Consider these factors:
-- Urgency tactics ("act now", "limited time")
-- Requests for personal information
-- Suspicious links or promises
-- Too-good-to-be-true offers
-- Impersonation attempts
-- Grammar and spelling issues
-- Cryptocurrency or investment schemes
-- Fake giveaways or contests
-
-Respond in JSON format with:
-{{
-    "is_suspicious": boolean,
-    "confidence": number (0-100),
-    "category": "scam|phishing|legitimate|unclear",
-    "explanation": "detailed explanation of your analysis",
-    "red_flags": ["list", "of", "specific", "concerns"],
-    "recommendations": "what users should do"
-}}
-"""
+        return self._STATIC_PROMPT_PREFIX + self._ANALYSIS_POST_TEMPLATE.format(
+            content=content, author=author, instance=instance,
+            red_flags=', '.join(red_flags) or 'none', hints=', '.join(hints) or 'none'
+        )
+    
+    def _user_message_content(self, prompt: str, prefix: str):
+        """Build the user message, marking the static prompt prefix as cacheable where supported."""
+        # Anthropic models only reuse a prompt prefix that is explicitly marked
+        if self.model.startswith('anthropic/') and prompt.startswith(prefix):
+            return [
+                {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": prompt[len(prefix):]}
+            ]
+        return prompt
     
-    def _parse_analysis_result(self, result: str) -> Dict[str, Any]:
-        """Parse the AI analysis result."""
+    def _parse_analysis_result(self, result: str, red_flags: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Parse the AI analysis result, falling back to the keyword red flags found beforehand."""
         try:
-            # Try to extract JSON from the response
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            parsed = _load_json_object(result)
+            if parsed is not None:
+                return parsed
             else:
                 # Fallback parsing if JSON format is not followed
                 return {
@@ -368,15 +1248,16 @@ Respond in JSON format with:
                     'confidence': 50,
                     'category': 'unclear',
                     'explanation': result,
-                    'red_flags': [],
+                    'red_flags': list(red_flags or []),
                     'recommendations': 'Manual review recommended'
                 }
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return {
                 'error': 'Could not parse analysis result',
                 'is_suspicious': False,
                 'confidence': 0,
-                'explanation': result
+                'explanation': result,
+                'red_flags': list(red_flags or [])
             }
 
 
@@ -388,9 +1269,12 @@ Respond in JSON format with:
 @click.option('--json', 'json_only', is_flag=True, help='Output only JSON with verdict, percentage, and reason')
 @click.option('--text', '-t', is_flag=True, help='Treat input as text content instead of URL')
 @click.option('--stdin', is_flag=True, help='Read text content from stdin')
-@click.option('--max-tokens', type=int, default=1000, help='Maximum tokens for AI response output (default: 1000)')
+@click.option('--batch', type=click.File('r'), help='Analyze every post URL listed in a file, one per line ("-" for stdin)')
+@click.option('--max-tokens', type=int, default=400, help='Maximum tokens for AI response output (default: 400)')
+@click.option('--stream', is_flag=True, help='Show the AI response live as it is generated (text output only)')
+@click.option('--no-cache', is_flag=True, help='Always call the AI model instead of reusing analyses of similar posts')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
-def analyze(url_or_text: str, api_key: str, model: str, output: str, verbose: bool, json_only: bool, text: bool, stdin: bool, max_tokens: int):
+def analyze(url_or_text: str, api_key: str, model: str, output: str, verbose: bool, json_only: bool, text: bool, stdin: bool, batch, max_tokens: int, stream: bool, no_cache: bool):
     """
     Analyze a Mastodon/Fediverse post for scam or phishing content.
     
@@ -401,6 +1285,10 @@ def analyze(url_or_text: str, api_key: str, model: str, output: str, verbose: bo
         click.echo("Error: OpenRouter API key is required. Set OPENROUTER_API_KEY environment variable or use --api-key option.", err=True)
         sys.exit(1)
     
+    if batch:
+        _analyze_batch(batch, api_key, model, output, verbose, json_only, max_tokens, no_cache)
+        return
+    
     if stdin:
         # Read from stdin
         if verbose:
@@ -459,14 +1347,20 @@ def analyze(url_or_text: str, api_key: str, model: str, output: str, verbose: bo
             click.echo(f"Content preview: {post_data.get('content', '')[:100]}...")
     
     # Analyze for scams/phishing
-    analyzer = ScamAnalyzer(api_key, model)
+    analyzer = _create_analyzer(api_key, model, no_cache)
     
     if json_only:
         # Use simplified JSON-only analysis
         analysis = analyzer.analyze_post_json_only(post_data, max_tokens)
-        click.echo(json.dumps(analysis, indent=2))
+        click.echo(orjson.dumps(analysis, option=orjson.OPT_INDENT_2).decode())
     else:
-        analysis = analyzer.analyze_post(post_data, max_tokens)
+        # Echo the response live while it is generated; the formatted
+        # report follows once it is complete
+        live_display = stream and output == 'text'
+        on_delta = (lambda delta: click.echo(delta, nl=False)) if live_display else None
+        analysis = analyzer.analyze_post(post_data, max_tokens, on_delta)
+        if live_display:
+            click.echo()
         
         # Output results
         if output == 'json':
@@ -476,11 +1370,62 @@ def analyze(url_or_text: str, api_key: str, model: str, output: str, verbose: bo
                 'post_data': post_data,
                 'analysis': analysis
             }
-            click.echo(json.dumps(result, indent=2))
+            click.echo(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
         else:
             _display_text_results(post_data, analysis)
 
 
+def _create_analyzer(api_key: str, model: str, no_cache: bool) -> ScamAnalyzer:
+    """Create the analyzer, with the analysis caches and exemplars unless disabled."""
+    if no_cache:
+        return ScamAnalyzer(api_key, model)
+    
+    return ScamAnalyzer(api_key, model, SemanticCache.for_model(model), PromptCache.open(), ExemplarIndex.load())
+
+
+def _analyze_batch(batch, api_key: str, model: str, output: str, verbose: bool, json_only: bool, max_tokens: int, no_cache: bool):
+    """Extract and analyze all post URLs listed in a batch file."""
+    urls = [line.strip() for line in batch if line.strip() and not line.lstrip().startswith('#')]
+    if not urls:
+        click.echo("Error: No URLs found in batch input", err=True)
+        sys.exit(1)
+    
+    if verbose:
+        click.echo(f"Extracting {len(urls)} posts...")
+    
+    extractor = MastodonPostExtractor()
+    posts = extractor.extract_many(urls)
+    
+    analyzer = _create_analyzer(api_key, model, no_cache)
+    results = []
+    
+    extracted = []
+    for url, post_data in zip(urls, posts):
+        if not post_data:
+            click.echo(f"Error: Could not extract post data from URL: {url}", err=True)
+        else:
+            extracted.append((url, post_data))
+    
+    if json_only:
+        for url, post_data in extracted:
+            analysis = analyzer.analyze_post_json_only(post_data, max_tokens)
+            results.append({'url': url, **analysis})
+    else:
+        analyses = analyzer.analyze_posts([post_data for _, post_data in extracted], max_tokens)
+        for (url, post_data), analysis in zip(extracted, analyses):
+            if output == 'json':
+                results.append({
+                    'url': url,
+                    'post_data': post_data,
+                    'analysis': analysis
+                })
+            else:
+                _display_text_results(post_data, analysis)
+    
+    if json_only or output == 'json':
+        click.echo(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode())
+
+
 def _display_text_results(post_data: Dict[str, Any], analysis: Dict[str, Any]):
     """Display analysis results in human-readable format."""
     click.echo("\n" + "="*60)
@@ -5,7 +5,16 @@ Test script for the Mastodon Post Analyzer
 
 import os
 import sys
-from mastodon_analyzer import MastodonPostExtractor, ScamAnalyzer
+import time
+import tempfile
+import orjson
+from urllib.parse import urlparse
+from types import SimpleNamespace
+from mastodon_analyzer import (
+    MastodonPostExtractor, ScamAnalyzer, SemanticCache, PromptCache, ExemplarIndex,
+    _find_keywords, _is_trivial_content, _JSONObjectScanner, _RateLimiter,
+    _parse_post_html, _find_json_object
+)
 
 def test_post_extraction():
     """Test post extraction functionality with mock data."""
@@ -23,6 +32,391 @@ def test_post_extraction():
     for url in test_urls:
         post_id = extractor._extract_post_id(url)
         print(f"URL: {url} -> Post ID: {post_id}")
+    
+    # Every supported URL format, including remote accounts, and URLs without an ID
+    expected = {
+        "https://mastodon.social/@user/123456789": "123456789",
+        "https://example.social/users/bob/statuses/111": "111",
+        "https://example.social/posts/222": "222",
+        "https://example.social/status/333": "333",
+        "https://example.social/@bob@remote.example/444": "444",
+        "https://example.social/about": None,
+        "https://example.social/@bob/media": None
+    }
+    for url, post_id in expected.items():
+        assert extractor._extract_post_id(url) == post_id, url
+
+class FakeResponse:
+    """Minimal requests.Response stand-in for offline extraction tests."""
+    
+    def __init__(self, status_code=200, text='', data=None):
+        self.status_code = status_code
+        self.text = text
+        self.data = data
+        self.headers = {}
+    
+    def json(self):
+        return self.data
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"{self.status_code} error")
+
+def test_html_extraction():
+    """Test extracting post data from page and API markup without network access."""
+    print("\nTesting HTML extraction...")
+    
+    page = """<html><head><meta property="og:description" content="Preview text"></head><body>
+<div class="status__display-name"><strong>Alice</strong></div>
+<article><div class="content">First post</div></article>
+<div class="status__content">Second post</div>
+</body></html>"""
+    
+    # The first content element in document order wins, whichever selector matches it
+    post_data = _parse_post_html('https://example.social/@alice/1', page)
+    print(f"Page -> {post_data}")
+    assert post_data['content'] == 'First post'
+    assert post_data['author'] == 'Alice'
+    assert post_data['instance'] == 'example.social'
+    
+    # Pages without a known content element fall back to og:description
+    post_data = _parse_post_html('https://example.social/@alice/1', '<head><meta property="og:description" content="Preview text"></head>')
+    assert post_data['content'] == 'Preview text'
+    assert post_data['author'] == ''
+    
+    # API content is an HTML fragment with entities
+    extractor = MastodonPostExtractor()
+    extractor._get = lambda url: FakeResponse(data={
+        'content': '<p>Tom &amp; Jerry&#39;s <a href="https://x.example/?a=1&amp;b=2">deal</a> &lt;3</p>',
+        'account': {'display_name': 'Bob'}
+    })
+    post_data = extractor._try_api_extraction('https://example.social/@bob/2', urlparse('https://example.social/@bob/2'))
+    print(f"API -> {post_data['content']!r}")
+    assert post_data['content'] == "Tom & Jerry's deal <3"
+
+def test_batch_extraction():
+    """Test batch extraction, falling back to the API, without network access."""
+    print("\nTesting batch extraction...")
+    
+    responses = {
+        'https://example.social/@alice/1': FakeResponse(
+            text='<div class="status__display-name"><strong>Alice</strong></div><div class="status__content">Hi there</div>'
+        ),
+        'https://example.social/@bob/2': FakeResponse(text='<p>Loading...</p>'),
+        'https://example.social/api/v1/statuses/2': FakeResponse(
+            data={'content': '<p>From the API</p>', 'account': {'display_name': 'Bob'}, 'created_at': '2024-01-01'}
+        ),
+        'https://example.social/@carol/3': FakeResponse(status_code=404),
+        'https://example.social/@dave/4': FakeResponse(text='<div class="status__content"><p>Hello</p> <p>world</p></div>'),
+        'https://example.social/api/v1/statuses/4': FakeResponse(data={'content': '<p>Hello world</p>'})
+    }
+    requested = []
+    
+    def fake_get(url):
+        requested.append(url)
+        return responses.get(url, FakeResponse(status_code=404))
+    
+    extractor = MastodonPostExtractor()
+    extractor._get = fake_get
+    
+    # The API is preferred, so the page isn't fetched when it has the post
+    result = extractor.extract_post_data('https://example.social/@dave/4')
+    print(f"API first -> {result['content']!r}, requested {requested}")
+    assert result['content'] == 'Hello world'
+    assert requested == ['https://example.social/api/v1/statuses/4']
+    
+    results = extractor.extract_many(list(responses)[:2] + ['https://example.social/@carol/3'])
+    print(f"Batch -> {results}")
+    assert results[0]['content'] == 'Hi there' and results[0]['author'] == 'Alice'
+    assert results[1]['content'] == 'From the API' and results[1]['author'] == 'Bob'
+    assert results[2] is None
+
+def test_rate_limiter():
+    """Test X-RateLimit header parsing and pacing without network access."""
+    print("\nTesting rate limiter...")
+    
+    limiter = _RateLimiter()
+    
+    # Mastodon's ISO 8601 reset time
+    limiter.update({'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': '2030-01-01T00:00:00.000Z'})
+    print(f"ISO 8601 -> remaining {limiter._remaining}, reset at {limiter._reset_at}")
+    assert limiter._remaining == 5
+    assert limiter._reset_at == 1893456000.0
+    
+    # Epoch seconds and seconds until the reset
+    limiter.update({'X-RateLimit-Remaining': '4', 'X-RateLimit-Reset': '1893456000'})
+    assert limiter._reset_at == 1893456000.0
+    limiter.update({'X-RateLimit-Remaining': '3', 'X-RateLimit-Reset': '60'})
+    assert 55 < limiter._reset_at - time.time() <= 60
+    
+    # Missing or malformed headers leave the limit alone
+    for headers in ({}, {'X-RateLimit-Remaining': 'many', 'X-RateLimit-Reset': '60'},
+                    {'X-RateLimit-Remaining': '1', 'X-RateLimit-Reset': 'soon'}):
+        limiter.update(headers)
+        assert limiter._remaining == 3
+    
+    # Each request reserves one of the remaining slots
+    limiter.wait()
+    assert limiter._remaining == 2
+    
+    # An exhausted limit whose reset has passed doesn't sleep, and is
+    # forgotten until the next response reports it again
+    limiter.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '2000-01-01T00:00:00Z'})
+    start = time.time()
+    limiter.wait()
+    assert time.time() - start < 0.1
+    assert limiter._remaining is None
+    
+    # An exhausted limit sleeps until the reset, capped at max_wait
+    limiter = _RateLimiter(max_wait=0.2)
+    limiter.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '60'})
+    start = time.time()
+    limiter.wait()
+    assert 0.15 < time.time() - start < 1
+
+def test_result_parsing():
+    """Test parsing of AI responses without calling the API."""
+    print("\nTesting result parsing...")
+    
+    analyzer = ScamAnalyzer('test-key')
+    
+    # JSON surrounded by prose, including a trailing brace after the object
+    result = analyzer._parse_analysis_result(
+        'Analysis: {"is_suspicious": true, "confidence": 90, "red_flags": {"a": 1}} (see {notes})'
+    )
+    print(f"Embedded JSON -> {result}")
+    assert result['is_suspicious'] is True
+    assert result['confidence'] == 90
+    
+    # Braces and escaped quotes inside strings don't end the object
+    result = analyzer._parse_analysis_result(
+        '{"explanation": "Uses a fake {template} \\"link\\" }", "confidence": 70}'
+    )
+    print(f"Braces in strings -> {result}")
+    assert result == {'explanation': 'Uses a fake {template} "link" }', 'confidence': 70}
+    
+    # Replies truncated at max_tokens are errors, not keyword heuristics
+    truncated = '{"is_suspicious": false, "confidence": 90, "explanation": "This is a normal po'
+    result = analyzer._parse_analysis_result(truncated)
+    print(f"Truncated -> {result}")
+    assert result['error'] == 'Could not parse analysis result'
+    assert result['is_suspicious'] is False
+    assert analyzer._parse_json_only_result('{"verdict": "legitimate", "reas')['verdict'] == 'error'
+    
+    # Stray braces in prose before the object are skipped
+    result = analyzer._parse_analysis_result('Note {x}: {"confidence": 60}')
+    print(f"Stray brace -> {result}")
+    assert result == {'confidence': 60}
+    
+    # Objects nested in a truncated reply are never mistaken for the answer,
+    # and adversarial braces are scanned in linear time
+    assert _find_json_object('{"is_suspicious": true, "meta": {"a": 1}, "explanation": "trunc') is None
+    assert _find_json_object('{' * 20000) is None
+    assert _find_json_object('{x}' * 20000 + '{"a": 1}') == '{"a": 1}'
+    
+    # No JSON at all falls back to keyword parsing
+    result = analyzer._parse_analysis_result('This looks like a scam to me.')
+    print(f"Plain text -> {result['category']}")
+    assert result['is_suspicious'] is True
+    assert result['category'] == 'unclear'
+    
+    result = analyzer._parse_json_only_result('{"verdict": "phishing", "percentage": "85", "reason": "Fake login"}')
+    print(f"JSON-only -> {result}")
+    assert result == {'verdict': 'phishing', 'percentage': 85, 'reason': 'Fake login'}
+    
+    # Batch results are keyed by post id
+    result = analyzer._parse_batch_result(
+        '{"analyses": [{"id": 0, "is_suspicious": false}, {"id": "1", "is_suspicious": true}, {"confidence": 5}]}'
+    )
+    print(f"Batch -> {result}")
+    assert result == {'0': {'is_suspicious': False}, '1': {'is_suspicious': True}}
+    assert analyzer._parse_batch_result('Sorry, I cannot help with that.') == {}
+
+class FakeStream:
+    """Chat completion stream that yields a response a few characters at a time."""
+    
+    def __init__(self, text, size=3):
+        self.deltas = [text[i:i + size] for i in range(0, len(text), size)]
+        self.sent = 0
+    
+    def __iter__(self):
+        for delta in self.deltas:
+            self.sent += 1
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+    
+    def close(self):
+        pass
+
+def test_streamed_json():
+    """Test that streaming stops only once a valid JSON object has arrived."""
+    print("\nTesting streamed JSON scanning...")
+    
+    response = 'Analyzing {content}... {"explanation": "a {b} \\"c\\" }", "confidence": 70} trailing {x}'
+    stream = FakeStream(response)
+    
+    analyzer = ScamAnalyzer('test-key')
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: stream)))
+    
+    text = analyzer._complete('system', 'prompt', '', 400)
+    print(f"Streamed {stream.sent}/{len(stream.deltas)} chunks -> {text!r}")
+    assert '"confidence": 70}' in text
+    assert 'trailing' not in text and stream.sent < len(stream.deltas)
+    assert analyzer._parse_analysis_result(text) == {'explanation': 'a {b} "c" }', 'confidence': 70}
+    
+    # The scanner itself reports every balanced block, valid or not
+    scanner = _JSONObjectScanner()
+    blocks = [scanner.feed(char) for char in 'a {b} {"c": 1}']
+    assert [block for block in blocks if block] == ['{b}'] * 10
+    assert scanner.skip() == '{"c": 1}'
+
+def test_batch_analysis():
+    """Test batched analysis with a fake client, including posts the model leaves out."""
+    print("\nTesting batch analysis...")
+    
+    requests_made = []
+    
+    def create(messages, **kwargs):
+        prompt = messages[1]['content']
+        if '\nPOSTS:\n' in prompt:
+            posts = orjson.loads(prompt.split('\nPOSTS:\n', 1)[1])['posts']
+            requests_made.append([post['id'] for post in posts])
+            # The model skips post 2 and answers the rest by id
+            analyses = [
+                {'id': post['id'], 'is_suspicious': 'bitcoin' in post['content'], 'category': 'scam'}
+                for post in posts if post['id'] != '2'
+            ]
+            return FakeStream(orjson.dumps({'analyses': analyses}).decode())
+        requests_made.append('single')
+        return FakeStream('{"is_suspicious": false, "category": "legitimate"}')
+    
+    analyzer = ScamAnalyzer('test-key')
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    
+    posts = [
+        {'content': 'Double your bitcoin in one day, guaranteed returns for everyone'},
+        {'content': 'Good morning!'},
+        {'content': 'Our community garden opens again next weekend, everyone welcome'},
+        {'content': 'Looking for recommendations for a lightweight text editor on Linux'}
+    ]
+    results = analyzer.analyze_posts(posts, batch_size=2)
+    print(f"Requests -> {requests_made}")
+    
+    # Trivial posts skip the model; the others go out two per request, and
+    # the post the model left out is retried on its own
+    assert sorted(request for request in requests_made if request != 'single') == [['0', '2'], ['3']]
+    assert requests_made.count('single') == 1
+    assert results[0]['is_suspicious'] is True
+    assert results[1]['category'] == 'legitimate'
+    assert results[2] == {'is_suspicious': False, 'category': 'legitimate'}
+    assert results[3]['is_suspicious'] is False
+    
+    # Malformed batch replies are treated as empty rather than raising
+    assert analyzer._parse_batch_result('{"analyses": null}') == {}
+    assert analyzer._parse_batch_result('{"analyses": {"id": 0}}') == {}
+
+def test_semantic_cache():
+    """Test that near-duplicate posts reuse a stored analysis."""
+    print("\nTesting semantic cache...")
+    
+    analysis = {'is_suspicious': True, 'confidence': 95, 'category': 'phishing'}
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SemanticCache.for_model('openai/gpt-oss-20b:free', cache_dir)
+        cache.add('🚨 URGENT! Your account will be suspended! Click here: bit.ly/verify-now', analysis)
+        
+        # A reloaded cache matches a variant with a different link
+        cache = SemanticCache.for_model('openai/gpt-oss-20b:free', cache_dir)
+        hit = cache.lookup('🚨 URGENT! Your account will be suspended! Click here: bit.ly/verify-123')
+        miss = cache.lookup('Just finished reading a great book about cybersecurity.')
+        print(f"Near-duplicate -> {hit}, unrelated -> {miss}")
+        assert hit == analysis
+        assert miss is None
+        
+        # Fallback results for replies that weren't JSON are not cached
+        analyzer = ScamAnalyzer('test-key', semantic_cache=cache)
+        analyzer._store_analysis('Some unparsed post', 'key', analyzer._parse_analysis_result(''))
+        assert cache.lookup('Some unparsed post') is None
+        
+        # Expired entries are ignored
+        cache.ttl = -1
+        assert cache.lookup('🚨 URGENT! Your account will be suspended! Click here: bit.ly/verify-now') is None
+
+def test_prompt_cache():
+    """Test that identical requests are answered from the prompt cache."""
+    print("\nTesting prompt cache...")
+    
+    analysis = {'verdict': 'scam', 'percentage': 90, 'reason': 'Crypto giveaway'}
+    key = PromptCache.make_key('openai/gpt-oss-20b:free', 0.1, 500, 'system', 'prompt')
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = PromptCache.open(cache_dir, max_entries=2)
+        cache.set(key, analysis)
+        
+        cache = PromptCache.open(cache_dir, max_entries=2)
+        print(f"Cached -> {cache.get(key)}")
+        assert cache.get(key) == analysis
+        assert cache.get(PromptCache.make_key('other/model', 0.1, 500, 'system', 'prompt')) is None
+        
+        # The oldest entries are evicted first
+        cache.set('second', analysis)
+        cache.set('third', analysis)
+        assert cache.get(key) is None
+        assert cache.get('third') == analysis
+
+def test_exemplar_matching():
+    """Test that close variants of known posts are classified without the API."""
+    print("\nTesting exemplar matching...")
+    
+    exemplars = ExemplarIndex.load()
+    
+    result = exemplars.analyze('🚨 URGENT! Your account will be suspended in 24 hours! Click here to verify: bit.ly/verify-123')
+    print(f"Known phishing variant -> {result['category']} ({result['confidence']}%)")
+    assert result['is_suspicious'] is True
+    assert result['category'] == 'phishing'
+    
+    result = exemplars.analyze('Does anyone have a good recipe for sourdough bread? Mine keeps coming out flat.')
+    print(f"Unrelated post -> {result}")
+    assert result is None
+    
+    # Legitimate notices only match while they carry no payload of their own
+    notice = 'Reminder: our instance will be down for scheduled maintenance tonight from 22:00 to 23:00 UTC. Thanks for your patience!'
+    assert exemplars.analyze(notice)['category'] == 'legitimate'
+    for altered in (notice.replace('Thanks', 'Re-login at masto-login.xyz. Thanks'), notice + ' DM me for details'):
+        result = exemplars.analyze(altered)
+        print(f"Altered legitimate notice -> {result}")
+        assert result is None
+
+def test_trivial_content():
+    """Test that short, plain posts are answered without the API."""
+    print("\nTesting trivial content shortcut...")
+    
+    analyzer = ScamAnalyzer('test-key')
+    
+    result = analyzer.analyze_post({'content': 'Good morning!'})
+    print(f"'Good morning!' -> {result['category']}")
+    assert result['is_suspicious'] is False
+    assert result['category'] == 'legitimate'
+    
+    result = analyzer.analyze_post_json_only({'content': 'Good morning!'})
+    assert result['verdict'] == 'legitimate'
+    
+    # Keywords rule out the shortcut even in short posts, but only strong
+    # scam phrases count as red flags
+    red_flags, hints = _find_keywords('Free BTC giveaway, act now!')
+    print(f"Red flags -> {red_flags}, hints -> {hints}")
+    assert red_flags == ['act now']
+    assert hints == ['free', 'btc', 'giveaway']
+    assert not _is_trivial_content('Free BTC giveaway', _find_keywords('Free BTC giveaway')[1])
+    assert _find_keywords('Loving free software!') == ([], ['free'])
+    assert _find_keywords('Freedom of speech matters') == ([], [])
+    
+    # Bare domains, handles, percentages and prices need a real analysis
+    for content in ('Visit coinz.io today', 'Earn 500% daily', 'DM @support now', 'Only $5 today'):
+        assert not _is_trivial_content(content, []), content
+    assert _is_trivial_content('Thanks, see you.', [])
+    
+    # Text without spaces is capped by length, not word count
+    assert not _is_trivial_content('恭喜您中奖了请添加客服微信领取一百万元奖金名额有限立即行动', [])
 
 def test_analysis_with_mock_data():
     """Test analysis with mock post data."""
@@ -107,6 +501,16 @@ if __name__ == '__main__':
     print("="*50)
     
     test_post_extraction()
+    test_html_extraction()
+    test_batch_extraction()
+    test_rate_limiter()
+    test_result_parsing()
+    test_streamed_json()
+    test_batch_analysis()
+    test_semantic_cache()
+    test_prompt_cache()
+    test_exemplar_matching()
+    test_trivial_content()
     test_analysis_with_mock_data()
     show_usage_examples()
     